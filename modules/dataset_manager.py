@@ -0,0 +1,425 @@
+import copy
+import json
+import os
+import shutil
+from typing import Dict, List, Optional, Any, Iterator
+
+import numpy as np
+import pandas as pd
+
+
+class DatasetManager:
+    """Columnar, memory-mapped cache for CSV files too large to load with pandas at once.
+
+    A CSV is converted once, chunk by chunk, into one ``.npy`` file per column:
+    numeric columns are stored as float64 (missing values as NaN) and all other
+    columns are dictionary encoded as int32 codes (missing values as -1) with
+    their vocabulary in a ``.vocab.npy`` file next to them. Reads go through
+    ``np.memmap`` so only the rows that are actually touched are paged into memory.
+    """
+
+    META_FILE = "meta.json"
+
+    def __init__(self, cache_dir: str = ".dataset_cache", chunk_rows: int = 500_000):
+        self.cache_dir = cache_dir
+        self.chunk_rows = chunk_rows
+        # name -> (meta.json mtime, meta, {column: CategoricalDtype}), see _load
+        self._loaded: Dict[str, tuple] = {}
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def _dataset_dir(self, name: str) -> str:
+        # Names come from the agent, so never let one point outside the cache
+        if (not name or name in (".", "..") or os.path.isabs(name)
+                or any(sep and sep in name for sep in (os.sep, os.altsep, "/"))):
+            raise ValueError(f"Invalid dataset name: {name!r}")
+        cache_root = os.path.realpath(self.cache_dir)
+        dataset_dir = os.path.realpath(os.path.join(cache_root, name))
+        if os.path.dirname(dataset_dir) != cache_root:
+            raise ValueError(f"Invalid dataset name: {name!r}")
+        return dataset_dir
+
+    def _column_path(self, name: str, column_index: int) -> str:
+        return os.path.join(self._dataset_dir(name), f"col_{column_index}.npy")
+
+    def _raw_path(self, name: str, column_index: int) -> str:
+        return os.path.join(self._dataset_dir(name), f"col_{column_index}.bin")
+
+    def _vocabulary_path(self, name: str, column_index: int) -> str:
+        return os.path.join(self._dataset_dir(name), f"col_{column_index}.vocab.npy")
+
+    def _default_name(self, csv_path: str) -> str:
+        return os.path.splitext(os.path.basename(csv_path))[0]
+
+    def convert_csv(self, csv_path: str, name: Optional[str] = None, overwrite: bool = False,
+                    kinds: Optional[Dict[str, str]] = None) -> Dict:
+        """Convert a CSV into the columnar cache, reading at most ``chunk_rows`` rows at a time.
+
+        Column kinds are inferred from the first chunk unless given in ``kinds``
+        (``"numeric"`` or ``"categorical"``). A later value that does not fit a
+        numeric column raises ``ValueError`` instead of being turned into NaN.
+        """
+        name = name or self._default_name(csv_path)
+        dataset_dir = self._dataset_dir(name)
+        meta_path = os.path.join(dataset_dir, self.META_FILE)
+
+        overrides = kinds or {}
+        for column, kind in overrides.items():
+            if kind not in ("numeric", "categorical"):
+                raise ValueError(f"Unknown kind {kind!r} for column '{column}', use 'numeric' or 'categorical'")
+
+        # A cached conversion is only reused for the same file, unchanged, with the same column kinds
+        if os.path.exists(meta_path) and not overwrite:
+            meta = self._load(name)[1]
+            if (meta.get("source") == os.path.abspath(csv_path)
+                    and meta.get("source_mtime") == os.path.getmtime(csv_path)
+                    and all(meta["kinds"].get(column, kind) == kind for column, kind in overrides.items())):
+                print(f"📦 Using cached dataset: {name}")
+                return self.get_dataset_info(name)
+
+        self._loaded.pop(name, None)
+        if os.path.exists(dataset_dir):
+            shutil.rmtree(dataset_dir)
+        os.makedirs(dataset_dir)
+
+        columns: List[str] = []
+        kinds = {}
+        vocabularies: Dict[str, Dict[str, np.ndarray]] = {}
+        rows = 0
+        raw_files = []
+
+        try:
+            # Every column is read as text so each chunk is parsed the same way:
+            # categorical values keep their spelling ('5' never becomes '5.0')
+            # and numeric columns are parsed, and checked, here.
+            for chunk in pd.read_csv(csv_path, chunksize=self.chunk_rows, dtype=str):
+                if not columns:
+                    columns = [str(c) for c in chunk.columns]
+                    for column in chunk.columns:
+                        key = str(column)
+                        kinds[key] = overrides.get(key) or self._infer_kind(chunk[column])
+                        if kinds[key] == "categorical":
+                            vocabularies[key] = {"values": np.empty(0, dtype=str), "codes": np.empty(0, dtype=np.int32)}
+                    raw_files = [open(self._raw_path(name, i), "wb") for i in range(len(columns))]
+
+                for i, column in enumerate(chunk.columns):
+                    key = str(column)
+                    if kinds[key] == "numeric":
+                        values = self._parse_numeric(chunk[column], key)
+                    else:
+                        values = self._encode_chunk(chunk[column], vocabularies[key])
+                    values.tofile(raw_files[i])
+                rows += len(chunk)
+        except Exception:
+            for f in raw_files:
+                f.close()
+            shutil.rmtree(dataset_dir, ignore_errors=True)
+            raise
+        finally:
+            for f in raw_files:
+                f.close()
+
+        # Wrap the raw column dumps in .npy headers so they can be memory-mapped later
+        for i, column in enumerate(columns):
+            dtype = np.float64 if kinds[column] == "numeric" else np.int32
+            raw = np.memmap(self._raw_path(name, i), dtype=dtype, mode="r", shape=(rows,)) if rows else np.empty(0, dtype=dtype)
+            out = np.lib.format.open_memmap(self._column_path(name, i), mode="w+", dtype=dtype, shape=(rows,))
+            for start in range(0, rows, self.chunk_rows):
+                out[start:start + self.chunk_rows] = raw[start:start + self.chunk_rows]
+            out.flush()
+            del out, raw
+            os.remove(self._raw_path(name, i))
+            if column in vocabularies:
+                vocab = vocabularies.pop(column)
+                ordered = np.empty_like(vocab["values"])
+                ordered[vocab["codes"]] = vocab["values"]
+                np.save(self._vocabulary_path(name, i), ordered)
+
+        meta = {
+            "name": name,
+            "source": os.path.abspath(csv_path),
+            "source_mtime": os.path.getmtime(csv_path),
+            "rows": rows,
+            "columns": columns,
+            "kinds": kinds,
+        }
+        with open(meta_path, "w", encoding="utf-8") as f:
+            json.dump(meta, f, ensure_ascii=False)
+
+        print(f"📦 Cached dataset {name}: {rows} rows, {len(columns)} columns")
+        return self.get_dataset_info(name)
+
+    @staticmethod
+    def _infer_kind(series: pd.Series) -> str:
+        values = series.dropna()
+        if values.empty:
+            return "categorical"
+        return "numeric" if pd.to_numeric(values, errors="coerce").notna().all() else "categorical"
+
+    @staticmethod
+    def _parse_numeric(series: pd.Series, column: str) -> np.ndarray:
+        parsed = pd.to_numeric(series, errors="coerce")
+        lost = parsed.isna() & series.notna()
+        if lost.any():
+            row = lost.idxmax()
+            raise ValueError(
+                f"Column '{column}' was detected as numeric but row {row} holds {series[row]!r}; "
+                f"convert again with kinds={{'{column}': 'categorical'}}"
+            )
+        return parsed.to_numpy(dtype=np.float64, na_value=np.nan)
+
+    @staticmethod
+    def _encode_chunk(series: pd.Series, vocabulary: Dict[str, np.ndarray]) -> np.ndarray:
+        """Map a chunk to codes, extending ``vocabulary`` with the values it has not seen yet.
+
+        The vocabulary is kept as a sorted array of values with their codes
+        rather than a dict, so a high-cardinality column costs one compact
+        array instead of a Python object per distinct value.
+        """
+        codes = np.full(len(series), -1, dtype=np.int32)
+        present = series.notna().to_numpy()
+        uniques, inverse = np.unique(series[present].to_numpy(dtype=str), return_inverse=True)
+        if not len(uniques):
+            return codes
+        known, known_codes = vocabulary["values"], vocabulary["codes"]
+        position = np.searchsorted(known, uniques)
+        found = position < len(known)
+        found[found] = known[position[found]] == uniques[found]
+        mapping = np.empty(len(uniques), dtype=np.int32)
+        mapping[found] = known_codes[position[found]]
+        new = ~found
+        mapping[new] = np.arange(len(known), len(known) + new.sum(), dtype=np.int32)
+        if new.any():
+            if uniques.dtype.itemsize > known.dtype.itemsize:
+                known = known.astype(uniques.dtype)
+            vocabulary["values"] = np.insert(known, position[new], uniques[new])
+            vocabulary["codes"] = np.insert(known_codes, position[new], mapping[new])
+        codes[present] = mapping[inverse]
+        return codes
+
+    def _load(self, name: str) -> tuple:
+        """Parse ``meta.json`` once and reuse it until the file is rewritten"""
+        meta_path = os.path.join(self._dataset_dir(name), self.META_FILE)
+        try:
+            stamp = os.stat(meta_path).st_mtime_ns
+        except FileNotFoundError:
+            self._loaded.pop(name, None)
+            raise FileNotFoundError(f"Dataset '{name}' is not cached, convert it first") from None
+        entry = self._loaded.get(name)
+        if entry is None or entry[0] != stamp:
+            with open(meta_path, "r", encoding="utf-8") as f:
+                entry = (stamp, json.load(f), {})
+            self._loaded[name] = entry
+        return entry
+
+    def _categories(self, name: str, column: str) -> pd.CategoricalDtype:
+        """Vocabulary of a categorical column, loaded once per conversion"""
+        _, meta, dtypes = self._load(name)
+        if column not in dtypes:
+            vocabulary = np.load(self._vocabulary_path(name, meta["columns"].index(column)))
+            dtypes[column] = pd.CategoricalDtype(vocabulary)
+        return dtypes[column]
+
+    def get_meta(self, name: str) -> Dict:
+        return copy.deepcopy(self._load(name)[1])
+
+    def list_datasets(self) -> List[str]:
+        return sorted(
+            entry for entry in os.listdir(self.cache_dir)
+            if os.path.exists(os.path.join(self.cache_dir, entry, self.META_FILE))
+        )
+
+    def get_dataset_info(self, name: str) -> Dict:
+        meta = self._load(name)[1]
+        return {
+            "name": meta["name"],
+            "source": meta["source"],
+            "rows": meta["rows"],
+            "columns": meta["columns"],
+            "kinds": meta["kinds"],
+        }
+
+    def get_column(self, name: str, column: str) -> np.ndarray:
+        """Return a read-only memory map over the raw column values (codes for categorical columns)"""
+        return self._open_columns(name, [column])[column]
+
+    def get_vocabulary(self, name: str, column: str) -> pd.Index:
+        """Values behind the codes of a categorical column"""
+        return self._categories(name, column).categories
+
+    def _to_frame(self, name: str, meta: Dict, maps: Dict[str, np.ndarray], index: Any) -> pd.DataFrame:
+        data = {}
+        for column in maps:
+            values = np.asarray(maps[column][index])
+            if meta["kinds"][column] == "categorical":
+                data[column] = pd.Categorical.from_codes(values, dtype=self._categories(name, column))
+            else:
+                data[column] = values
+        return pd.DataFrame(data)
+
+    def _open_columns(self, name: str, columns: Optional[List[str]]) -> Dict[str, np.ndarray]:
+        meta = self._load(name)[1]
+        maps = {}
+        for column in (columns or meta["columns"]):
+            if column not in meta["columns"]:
+                raise KeyError(f"Column '{column}' not in dataset '{name}'")
+            maps[column] = np.load(self._column_path(name, meta["columns"].index(column)), mmap_mode="r")
+        return maps
+
+    def read_rows(self, name: str, start: int = 0, stop: Optional[int] = None,
+                  columns: Optional[List[str]] = None) -> pd.DataFrame:
+        """Materialize a contiguous row range as a DataFrame"""
+        meta = self._load(name)[1]
+        stop = meta["rows"] if stop is None else min(stop, meta["rows"])
+        frame = self._to_frame(name, meta, self._open_columns(name, columns), slice(start, stop))
+        frame.index = pd.RangeIndex(start, start + len(frame))
+        return frame
+
+    def iter_chunks(self, name: str, chunk_rows: Optional[int] = None,
+                    columns: Optional[List[str]] = None) -> Iterator[pd.DataFrame]:
+        """Yield the dataset as DataFrames of at most ``chunk_rows`` rows"""
+        meta = self._load(name)[1]
+        maps = self._open_columns(name, columns)
+        chunk_rows = chunk_rows or self.chunk_rows
+        for start in range(0, meta["rows"], chunk_rows):
+            frame = self._to_frame(name, meta, maps, slice(start, start + chunk_rows))
+            frame.index = pd.RangeIndex(start, start + len(frame))
+            yield frame
+
+    def sample(self, name: str, n: int = 1000, columns: Optional[List[str]] = None,
+               seed: Optional[int] = None) -> pd.DataFrame:
+        """Uniform random sample of ``n`` rows without loading the full dataset"""
+        meta = self._load(name)[1]
+        n = min(n, meta["rows"])
+        rng = np.random.default_rng(seed)
+        index = np.sort(rng.choice(meta["rows"], size=n, replace=False))
+        frame = self._to_frame(name, meta, self._open_columns(name, columns), index)
+        frame.index = pd.Index(index)
+        return frame
+
+    def summarize(self, name: str, columns: Optional[List[str]] = None, bins: int = 20,
+                  top_k: int = 10, correlations: bool = True) -> Dict:
+        """Null and infinite counts, moments, histograms and correlations computed per chunk and merged"""
+        meta = self._load(name)[1]
+        maps = self._open_columns(name, columns)
+        rows = meta["rows"]
+        numeric = [c for c in maps if meta["kinds"][c] == "numeric"]
+        categorical = [c for c in maps if meta["kinds"][c] == "categorical"]
+
+        stats: Dict[str, Dict[str, Any]] = {
+            c: {"count": 0, "mean": np.zeros(1), "m2": np.zeros((1, 1)), "min": np.inf, "max": -np.inf}
+            for c in numeric
+        }
+        nulls = {c: 0 for c in maps}
+        vocabularies = {c: self.get_vocabulary(name, c) for c in categorical}
+        code_counts = {c: np.zeros(len(vocabularies[c]), dtype=np.int64) for c in categorical}
+
+        infinite = {c: 0 for c in numeric}
+
+        # Pass 1: nulls, moments, ranges and category frequencies. '-inf'/'inf'
+        # parse as numbers, so only finite values feed the statistics.
+        for start in range(0, rows, self.chunk_rows):
+            block = slice(start, start + self.chunk_rows)
+            for c in numeric:
+                values = np.asarray(maps[c][block])
+                valid = values[np.isfinite(values)]
+                nulls[c] += int(np.isnan(values).sum())
+                infinite[c] += int(np.isinf(values).sum())
+                if len(valid):
+                    s = stats[c]
+                    s["count"], s["mean"], s["m2"] = self._merge_moments(
+                        s["count"], s["mean"], s["m2"], valid[:, None]
+                    )
+                    s["min"] = min(s["min"], float(valid.min()))
+                    s["max"] = max(s["max"], float(valid.max()))
+            for c in categorical:
+                codes = np.asarray(maps[c][block])
+                valid = codes[codes >= 0]
+                nulls[c] += len(codes) - len(valid)
+                code_counts[c] += np.bincount(valid, minlength=len(code_counts[c]))
+
+        # Pass 2: histograms over the global ranges and the co-moments for correlation
+        edges = {c: np.linspace(stats[c]["min"], stats[c]["max"], bins + 1)
+                 for c in numeric if stats[c]["count"]}
+        hist_counts = {c: np.zeros(bins, dtype=np.int64) for c in edges}
+        corr_columns = numeric if correlations and len(numeric) > 1 else []
+        k = len(corr_columns)
+        complete_rows = 0
+        col_mean = np.zeros(k)
+        co_moment = np.zeros((k, k))
+
+        if edges or corr_columns:
+            for start in range(0, rows, self.chunk_rows):
+                block = slice(start, start + self.chunk_rows)
+                for c in edges:
+                    values = np.asarray(maps[c][block])
+                    hist_counts[c] += np.histogram(values[np.isfinite(values)], bins=edges[c])[0]
+                if corr_columns:
+                    matrix = np.column_stack([np.asarray(maps[c][block]) for c in corr_columns])
+                    matrix = matrix[np.isfinite(matrix).all(axis=1)]
+                    complete_rows, col_mean, co_moment = self._merge_moments(
+                        complete_rows, col_mean, co_moment, matrix
+                    )
+
+        summary: Dict[str, Any] = {"name": name, "rows": rows, "nulls": nulls, "numeric": {}, "categorical": {}}
+        for c in numeric:
+            s = stats[c]
+            if s["count"]:
+                summary["numeric"][c] = {
+                    "count": s["count"], "infinite": infinite[c], "mean": self._finite(s["mean"][0]),
+                    "std": self._finite(np.sqrt(max(s["m2"][0, 0], 0.0) / s["count"])),
+                    "min": s["min"], "max": s["max"],
+                    "histogram": {"edges": [self._finite(e) for e in edges[c]], "counts": hist_counts[c].tolist()},
+                }
+            else:
+                summary["numeric"][c] = {"count": 0, "infinite": infinite[c]}
+        for c in categorical:
+            counts = code_counts[c]
+            order = np.argsort(counts)[::-1][:top_k]
+            summary["categorical"][c] = {
+                "unique": int((counts > 0).sum()),
+                "top": {vocabularies[c][i]: int(counts[i]) for i in order if counts[i] > 0},
+            }
+        if corr_columns and complete_rows > 1:
+            scale = np.sqrt(np.clip(np.diag(co_moment), 0, None))
+            with np.errstate(divide="ignore", invalid="ignore"):
+                corr = co_moment / np.outer(scale, scale)
+            # Constant columns have no defined correlation
+            summary["correlations"] = {
+                a: {b: (round(float(np.clip(corr[i, j], -1.0, 1.0)), 6) if np.isfinite(corr[i, j]) else None)
+                    for j, b in enumerate(corr_columns)}
+                for i, a in enumerate(corr_columns)
+            }
+        return summary
+
+    @staticmethod
+    def _finite(value: float) -> Optional[float]:
+        """NaN and infinity are not valid JSON, so report them as None"""
+        value = float(value)
+        return value if np.isfinite(value) else None
+
+    @staticmethod
+    def _merge_moments(count: int, mean: np.ndarray, m2: np.ndarray, chunk: np.ndarray) -> tuple:
+        """Fold a (rows x columns) chunk into running count, mean and co-moment matrix.
+
+        Uses Chan et al.'s parallel update so large offsets (e.g. timestamps)
+        do not cancel out the way ``sum_sq / n - mean**2`` does.
+        """
+        n_chunk = len(chunk)
+        if not n_chunk:
+            return count, mean, m2
+        chunk_mean = chunk.mean(axis=0)
+        centered = chunk - chunk_mean
+        total = count + n_chunk
+        delta = chunk_mean - mean
+        mean = mean + delta * (n_chunk / total)
+        m2 = m2 + centered.T @ centered + np.outer(delta, delta) * (count * n_chunk / total)
+        return total, mean, m2
+
+    def drop_dataset(self, name: str) -> bool:
+        dataset_dir = self._dataset_dir(name)
+        self._loaded.pop(name, None)
+        if not os.path.exists(dataset_dir):
+            return False
+        shutil.rmtree(dataset_dir)
+        print(f"🗑️ Dropped cached dataset: {name}")
+        return True
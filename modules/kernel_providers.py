@@ -0,0 +1,226 @@
+import os
+import threading
+from abc import ABC, abstractmethod
+from typing import Callable, Dict, List, Optional
+
+from jupyter_client import BlockingKernelClient, KernelManager
+
+
+class KernelProvider(ABC):
+    """Interface for where a NotebookController's kernel lives.
+
+    A provider owns the lifecycle of one kernel and hands out a blocking
+    client that the controller uses for execution.
+    """
+
+    def __init__(self):
+        self.kernel_client = None
+        self.host_name: Optional[str] = None
+
+    @property
+    def kernel_id(self) -> Optional[str]:
+        return None
+
+    @abstractmethod
+    def start(self) -> None:
+        """Launch or attach to the kernel and set ``kernel_client``"""
+
+    @abstractmethod
+    def stop(self) -> None:
+        """Release the kernel"""
+
+    @abstractmethod
+    def interrupt(self) -> None:
+        """Interrupt the code currently running in the kernel"""
+
+    def restart(self) -> None:
+        """Give the controller a fresh interpreter state"""
+        self.stop()
+        self.start()
+
+
+class LocalKernelProvider(KernelProvider):
+    """Launch a kernel as a child process of the agent host"""
+
+    def __init__(self, kernel_name: str = 'python3', ready_timeout: int = 10):
+        super().__init__()
+        self.kernel_name = kernel_name
+        self.ready_timeout = ready_timeout
+        self.kernel_manager = None
+
+    @property
+    def kernel_id(self) -> Optional[str]:
+        return getattr(self.kernel_manager, 'kernel_id', None)
+
+    def start(self) -> None:
+        self.kernel_manager = KernelManager(kernel_name=self.kernel_name)
+        self.kernel_manager.start_kernel()
+        self.kernel_client = self.kernel_manager.client()
+        self.kernel_client.start_channels()
+        try:
+            self.kernel_client.wait_for_ready(timeout=self.ready_timeout)
+        except Exception:
+            self.kernel_client.stop_channels()
+            self.kernel_manager.shutdown_kernel(now=True)
+            raise
+
+    def stop(self) -> None:
+        if self.kernel_client:
+            self.kernel_client.stop_channels()
+        if self.kernel_manager:
+            self.kernel_manager.shutdown_kernel()
+
+    def interrupt(self) -> None:
+        if self.kernel_manager:
+            self.kernel_manager.interrupt_kernel()
+
+
+class RemoteKernelProvider(KernelProvider):
+    """Attach to an already running kernel through its connection file.
+
+    The kernel can live in any process or on any node whose ZMQ ports are
+    reachable, e.g. one started with ``jupyter kernel --KernelManager.connection_file=kernel.json``.
+    Since the process is not ours, ``restart`` resets the interpreter
+    namespace instead of relaunching it, and ``stop`` only detaches unless
+    ``shutdown_on_stop`` is set. Pooled kernels are shared by successive
+    sessions, so the namespace is also reset when a session attaches and
+    when it detaches.
+    """
+
+    def __init__(self, connection_file: str, ready_timeout: int = 10, shutdown_on_stop: bool = False):
+        super().__init__()
+        self.connection_file = connection_file
+        self.ready_timeout = ready_timeout
+        self.shutdown_on_stop = shutdown_on_stop
+
+    @property
+    def kernel_id(self) -> Optional[str]:
+        name = os.path.splitext(os.path.basename(self.connection_file))[0]
+        return name[len('kernel-'):] if name.startswith('kernel-') else name
+
+    def start(self) -> None:
+        self.kernel_client = BlockingKernelClient()
+        self.kernel_client.load_connection_file(self.connection_file)
+        self.kernel_client.start_channels()
+        try:
+            self.kernel_client.wait_for_ready(timeout=self.ready_timeout)
+            self._reset_namespace()
+        except Exception:
+            # Unreachable or busy kernel: detach, leaving the kernel itself alone
+            self.kernel_client.stop_channels()
+            raise
+
+    def stop(self) -> None:
+        if not self.kernel_client or not self.kernel_client.channels_running:
+            return
+        if self.shutdown_on_stop:
+            self.kernel_client.shutdown()
+        else:
+            try:
+                # Don't leave this session's variables to whoever attaches next
+                self._reset_namespace()
+            except Exception as e:
+                print(f"Error resetting remote kernel: {e}")
+        self.kernel_client.stop_channels()
+
+    def interrupt(self) -> None:
+        # Message based interrupt over the control channel, no signals across hosts
+        if self.kernel_client:
+            msg = self.kernel_client.session.msg('interrupt_request', content={})
+            self.kernel_client.control_channel.send(msg)
+
+    def restart(self) -> None:
+        if not self.kernel_client or not self.kernel_client.channels_running:
+            self.start()
+        else:
+            self._reset_namespace()
+
+    def _reset_namespace(self) -> None:
+        self.kernel_client.execute_interactive(
+            'get_ipython().reset(new_session=True, aggressive=True)',
+            silent=True, store_history=False, timeout=self.ready_timeout,
+            output_hook=lambda msg: None
+        )
+
+
+class KernelHost:
+    """A place kernels can be started on, with an optional session capacity.
+
+    ``load`` is active sessions per unit of ``weight``, the same measure for
+    every host. ``weight`` is the host's relative size and defaults to its
+    capacity, or 1 for hosts without one, so an uncapped host counts as a
+    single-slot host unless told otherwise.
+    """
+
+    def __init__(self, name: str, provider_factory: Callable[[], KernelProvider],
+                 capacity: Optional[int] = None, weight: Optional[float] = None):
+        self.name = name
+        self.provider_factory = provider_factory
+        self.capacity = capacity
+        self.weight = weight or capacity or 1
+        self.active: List[KernelProvider] = []
+
+    @property
+    def load(self) -> float:
+        return len(self.active) / self.weight
+
+    def has_capacity(self) -> bool:
+        return self.capacity is None or len(self.active) < self.capacity
+
+    def create_provider(self) -> KernelProvider:
+        return self.provider_factory()
+
+
+class ConnectionFileHost(KernelHost):
+    """A host exposing a fixed pool of running kernels, one session per connection file"""
+
+    def __init__(self, name: str, connection_files: List[str], weight: Optional[float] = None, **provider_kwargs):
+        super().__init__(name, provider_factory=self._next_provider, capacity=len(connection_files), weight=weight)
+        self.connection_files = list(connection_files)
+        self.provider_kwargs = provider_kwargs
+
+    def _next_provider(self) -> KernelProvider:
+        in_use = {getattr(p, 'connection_file', None) for p in self.active}
+        for connection_file in self.connection_files:
+            if connection_file not in in_use:
+                return RemoteKernelProvider(connection_file, **self.provider_kwargs)
+        raise RuntimeError(f"No free kernel on host {self.name}")
+
+
+class KernelScheduler:
+    """Place notebook sessions on the least-loaded kernel host"""
+
+    def __init__(self, hosts: List[KernelHost]):
+        if not hosts:
+            raise ValueError("KernelScheduler needs at least one host")
+        self.hosts = hosts
+        self._lock = threading.Lock()
+
+    def acquire(self, exclude: Optional[List[str]] = None) -> KernelProvider:
+        """Hand out a provider on the least-loaded host, skipping hosts named in ``exclude``"""
+        with self._lock:
+            candidates = [host for host in self.hosts
+                          if host.has_capacity() and host.name not in (exclude or [])]
+            if not candidates:
+                raise RuntimeError("No kernel host with free capacity left to try")
+            host = min(candidates, key=lambda h: h.load)
+            provider = host.create_provider()
+            provider.host_name = host.name
+            host.active.append(provider)
+        print(f"📍 Placed kernel session on host: {host.name}")
+        return provider
+
+    def release(self, provider: KernelProvider) -> None:
+        with self._lock:
+            for host in self.hosts:
+                if provider in host.active:
+                    host.active.remove(provider)
+                    return
+
+    def get_load(self) -> Dict[str, Dict]:
+        with self._lock:
+            return {
+                host.name: {"active": len(host.active), "capacity": host.capacity,
+                            "weight": host.weight, "load": host.load}
+                for host in self.hosts
+            }
@@ -1,17 +1,66 @@
 import json
 import os
 import uuid
+import hashlib
+import difflib
 import queue
 import time
+import textwrap
+import shutil
+import tempfile
+import threading
+import functools
+import copy
+from concurrent.futures import Future, ThreadPoolExecutor
 from datetime import datetime
-from typing import Dict, List, Optional, Any
+from typing import Dict, List, Optional, Any, Tuple
 import subprocess
-from jupyter_client import KernelManager
+from modules.kernel_providers import KernelProvider, KernelScheduler, LocalKernelProvider
+from modules.output_cache import OutputCache
+from modules.rw_lock import ReadWriteLock
+
+
+def _reads(method):
+    """Hold the document read lock for the duration of the call"""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self._doc_lock.read_locked():
+            return method(self, *args, **kwargs)
+    return wrapper
+
+
+def _writes(method):
+    """Hold the document write lock for the duration of the call"""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self._doc_lock.write_locked():
+            return method(self, *args, **kwargs)
+    return wrapper
+
 
 class NotebookController:
-    def __init__(self, notebook_path: Optional[str] = None):
+    def __init__(self, notebook_path: Optional[str] = None,
+                 kernel_provider: Optional[KernelProvider] = None,
+                 kernel_scheduler: Optional[KernelScheduler] = None,
+                 output_cache_bytes: Optional[int] = 64 * 1024 * 1024,
+                 output_spill_dir: Optional[str] = None):
+        # Tool calls may arrive from several threads: the document is guarded by a
+        # read/write lock, file writes by a plain lock, and kernel work runs one
+        # request at a time on a dedicated execution thread
+        self._doc_lock = ReadWriteLock()
+        self._file_lock = threading.Lock()
+        self._execution_queue = ThreadPoolExecutor(max_workers=1, thread_name_prefix="kernel-exec")
         self.notebook_path = notebook_path
         self.notebook_data = {}
+        # Outputs beyond the byte budget are spilled to disk, LRU first
+        self.output_cache = OutputCache(output_cache_bytes, output_spill_dir)
+        self.kernel_scheduler = kernel_scheduler
+        # Only a provider handed out by the scheduler occupies one of its slots
+        self._holds_slot = kernel_provider is None and kernel_scheduler is not None
+        if kernel_provider is None:
+            kernel_provider = kernel_scheduler.acquire() if kernel_scheduler else LocalKernelProvider()
+        self.kernel_provider = kernel_provider
+        self._closed = False
         self.kernel_manager = None
         self.kernel_client = None
         self.cell_id_map = {}
@@ -30,7 +79,10 @@ class NotebookController:
         
         # Start the kernel for persistent execution
         self.start_kernel()
+        if self._holds_slot:
+            self._fail_over()
 
+    @_writes
     def create_notebook(self, path: str) -> None:
         self.notebook_path = path
         self.notebook_data = {
@@ -49,20 +101,25 @@ class NotebookController:
             "nbformat": 4,
             "nbformat_minor": 4
         }
+        self.output_cache.clear()
         self.save_notebook()
         self._update_cell_id_map()
         print(f"Created new notebook: {path}")
     
+    @_writes
     def load_notebook(self, path: str) -> None:
         try:
             with open(path, 'r', encoding='utf-8') as f:
                 self.notebook_data = json.load(f)
             self.notebook_path = path
             self._update_cell_id_map()
+            self.output_cache.clear()
             
             # Get the highest execution count from existing cells
             max_count = 0
             for cell in self.notebook_data.get('cells', []):
+                if cell.get('cell_type') == 'code':
+                    self.output_cache.put(cell)
                 if cell.get('cell_type') == 'code' and cell.get('execution_count'):
                     max_count = max(max_count, cell['execution_count'])
             self.execution_count = max_count
@@ -72,10 +129,35 @@ class NotebookController:
             print(f"Error loading notebook: {e}")
             raise
     
+    def _dump_indented(self, value: Any, prefix: str) -> str:
+        text = json.dumps(value, indent=2, ensure_ascii=False)
+        return textwrap.indent(text, prefix)[len(prefix):]
+    
+    def _write_notebook(self, f) -> None:
+        """Write the document one cell at a time, pulling evicted outputs back from disk.
+        
+        Produces the same layout as ``json.dump(..., indent=2)`` without ever
+        holding every cell's outputs in memory at once.
+        """
+        cells = self.notebook_data.get("cells", [])
+        f.write('{\n  "cells": [')
+        for i, cell in enumerate(cells):
+            if "outputs" in cell:
+                # Single cache call, so a concurrent eviction cannot hide the outputs
+                cell = {**cell, "outputs": self.output_cache.load_outputs(cell)}
+            f.write(',\n    ' if i else '\n    ')
+            f.write(self._dump_indented(cell, '    '))
+        f.write('\n  ]' if cells else ']')
+        for key, value in self.notebook_data.items():
+            if key != "cells":
+                f.write(f',\n  {json.dumps(key)}: {self._dump_indented(value, "  ")}')
+        f.write('\n}')
+    
+    @_reads
     def save_notebook(self) -> None:
         try:
-            with open(self.notebook_path, 'w', encoding='utf-8') as f:
-                json.dump(self.notebook_data, f, indent=2, ensure_ascii=False)
+            with self._file_lock, open(self.notebook_path, 'w', encoding='utf-8') as f:
+                self._write_notebook(f)
             print(f"Saved notebook: {self.notebook_path}")
         except Exception as e:
             print(f"Error saving notebook: {e}")
@@ -84,13 +166,10 @@ class NotebookController:
     def start_kernel(self) -> None:
         """Start a persistent Python kernel for cell execution"""
         try:
-            self.kernel_manager = KernelManager(kernel_name='python3')
-            self.kernel_manager.start_kernel()
-            self.kernel_client = self.kernel_manager.client()
-            self.kernel_client.start_channels()
-            
-            # Wait for kernel to be ready
-            self.kernel_client.wait_for_ready(timeout=10)
+            # The provider decides where the kernel runs and waits for it to be ready
+            self.kernel_provider.start()
+            self.kernel_client = self.kernel_provider.kernel_client
+            self.kernel_manager = getattr(self.kernel_provider, 'kernel_manager', None)
             self.kernel_ready = True
             print("🔥 Kernel started successfully")
             
@@ -98,13 +177,25 @@ class NotebookController:
             print(f"Error starting kernel: {e}")
             self.kernel_ready = False
     
+    def _fail_over(self) -> None:
+        """Move to another host while the scheduled kernel cannot be started"""
+        tried = []
+        while not self.kernel_ready:
+            tried.append(self.kernel_provider.host_name)
+            self.kernel_scheduler.release(self.kernel_provider)
+            self._holds_slot = False
+            try:
+                self.kernel_provider = self.kernel_scheduler.acquire(exclude=tried)
+            except RuntimeError as e:
+                print(f"No other kernel host available: {e}")
+                return
+            self._holds_slot = True
+            self.start_kernel()
+    
     def stop_kernel(self) -> None:
         """Stop the persistent kernel"""
         try:
-            if self.kernel_client:
-                self.kernel_client.stop_channels()
-            if self.kernel_manager:
-                self.kernel_manager.shutdown_kernel()
+            self.kernel_provider.stop()
             self.kernel_ready = False
             print("🛑 Kernel stopped")
         except Exception as e:
@@ -112,18 +203,33 @@ class NotebookController:
     
     def restart_kernel(self) -> None:
         """Restart the kernel and reset execution state"""
+        # Queued behind pending executions so it never interleaves with one
+        self._execution_queue.submit(self._restart_kernel).result()
+    
+    def _restart_kernel(self) -> None:
         print("🔄 Restarting kernel...")
-        self.stop_kernel()
-        self.execution_count = 0
-        
-        # Clear all execution counts and outputs
-        for cell in self.notebook_data.get('cells', []):
-            if cell.get('cell_type') == 'code':
-                cell['execution_count'] = None
-                cell['outputs'] = []
-        
-        self.save_notebook()
-        self.start_kernel()
+        with self._doc_lock.write_locked():
+            self.execution_count = 0
+            
+            # Clear all execution counts and outputs
+            for cell in self.notebook_data.get('cells', []):
+                if cell.get('cell_type') == 'code':
+                    cell['execution_count'] = None
+                    cell['outputs'] = []
+                    cell.get('metadata', {}).pop('output_hashes', None)
+                    cell.get('metadata', {}).pop('output_mime_hashes', None)
+            self.output_cache.clear()
+            
+            self.save_notebook()
+        try:
+            self.kernel_provider.restart()
+            self.kernel_client = self.kernel_provider.kernel_client
+            self.kernel_manager = getattr(self.kernel_provider, 'kernel_manager', None)
+            self.kernel_ready = True
+            print("🔥 Kernel restarted successfully")
+        except Exception as e:
+            print(f"Error restarting kernel: {e}")
+            self.kernel_ready = False
         self._trigger_visual_update()
     
     def _update_cell_id_map(self) -> None:
@@ -138,6 +244,7 @@ class NotebookController:
     def _generate_cell_id(self) -> str:
         return str(uuid.uuid4())
     
+    @_writes
     def insert_cell(self, cell_type: str, source: str, 
                    index: Optional[int] = None, cell_id: Optional[str] = None) -> str:
         if cell_id is None:
@@ -166,6 +273,7 @@ class NotebookController:
         print(f"Inserted {cell_type} cell with ID: {cell_id}")
         return cell_id
     
+    @_writes
     def delete_cell(self, cell_id: str) -> bool:
         if cell_id not in self.cell_id_map:
             print(f"Cell ID {cell_id} not found")
@@ -173,6 +281,7 @@ class NotebookController:
         
         index = self.cell_id_map[cell_id]
         self.notebook_data["cells"].pop(index)
+        self.output_cache.discard(cell_id)
         self._update_cell_id_map()
         self.save_notebook()
         self._trigger_visual_update()
@@ -180,9 +289,11 @@ class NotebookController:
         print(f"Deleted cell: {cell_id}")
         return True
     
+    @_writes
     def delete_cell_by_index(self, index: int) -> bool:
         if 0 <= index < len(self.notebook_data["cells"]):
             deleted_cell = self.notebook_data["cells"].pop(index)
+            self.output_cache.discard(deleted_cell.get("id"))
             self._update_cell_id_map()
             self.save_notebook()
             self._trigger_visual_update()
@@ -192,19 +303,35 @@ class NotebookController:
             print(f"Invalid index: {index}")
             return False
     
+    @_reads
     def get_cell(self, cell_id: str) -> Optional[Dict]:
-        if cell_id not in self.cell_id_map:
-            return None
-        index = self.cell_id_map[cell_id]
-        return self.notebook_data["cells"][index]
+        """Return a copy of the cell with its outputs loaded, even if they were spilled to disk"""
+        cell = self._get_live_cell(cell_id)
+        return self._snapshot_cell(cell) if cell else None
     
+    @_reads
     def get_cell_by_index(self, index: int) -> Optional[Dict]:
         if 0 <= index < len(self.notebook_data["cells"]):
-            return self.notebook_data["cells"][index]
+            return self._snapshot_cell(self.notebook_data["cells"][index])
         return None
     
+    def _get_live_cell(self, cell_id: str) -> Optional[Dict]:
+        """The cell dict inside the document, for callers holding the document lock"""
+        if cell_id not in self.cell_id_map:
+            return None
+        return self.notebook_data["cells"][self.cell_id_map[cell_id]]
+    
+    def _snapshot_cell(self, cell: Dict) -> Dict:
+        # A detached copy: later evictions or edits never change what the caller holds
+        snapshot = copy.deepcopy({k: v for k, v in cell.items() if k != "outputs"})
+        if "outputs" in cell:
+            self.output_cache.touch(cell["id"])
+            snapshot["outputs"] = list(self.output_cache.load_outputs(cell))
+        return snapshot
+    
+    @_writes
     def update_cell_source(self, cell_id: str, source: str) -> bool:
-        cell = self.get_cell(cell_id)
+        cell = self._get_live_cell(cell_id)
         if cell:
             cell["source"] = source.split('\n') if isinstance(source, str) else source
             self.save_notebook()
@@ -213,6 +340,7 @@ class NotebookController:
             return True
         return False
     
+    @_writes
     def move_cell(self, cell_id: str, new_index: int) -> bool:
         if cell_id not in self.cell_id_map:
             print(f"Cell ID {cell_id} not found")
@@ -229,29 +357,169 @@ class NotebookController:
         print(f"Moved cell {cell_id} from index {old_index} to {new_index}")
         return True
     
-    def run_cell(self, cell_id: str, timeout: int = 30) -> Dict:
-        """Execute a cell using the persistent kernel"""
+    def _fingerprint_output(self, output: Dict) -> str:
+        """Stable hash of an output, ignoring the execution counter"""
+        payload = {k: v for k, v in output.items() if k != 'execution_count'}
+        return hashlib.sha256(json.dumps(payload, sort_keys=True).encode('utf-8')).hexdigest()[:16]
+    
+    def _fingerprint_data(self, output: Dict) -> Dict[str, str]:
+        """Hash of each MIME representation of a rich output, so a redrawn plot shows up as ``image/png`` changing"""
+        return {
+            mime: hashlib.sha256(json.dumps(value, sort_keys=True).encode('utf-8')).hexdigest()[:16]
+            for mime, value in output.get('data', {}).items()
+        }
+    
+    def _output_text(self, output: Dict) -> Optional[str]:
+        output_type = output.get('output_type')
+        if output_type == 'stream':
+            return output.get('text', '')
+        if output_type == 'error':
+            return f"{output.get('ename', 'Error')}: {output.get('evalue', '')}"
+        text = output.get('data', {}).get('text/plain')
+        if text is None:
+            return None
+        return ''.join(text) if isinstance(text, list) else text
+    
+    def _diff_outputs(self, old_outputs: List[Dict], old_hashes: Optional[List[str]],
+                      new_outputs: List[Dict], new_hashes: List[str],
+                      old_mime_hashes: Optional[List[Dict[str, str]]] = None) -> Dict:
+        """Describe new outputs relative to the previous run as unchanged, changed or new"""
+        if old_hashes is None:
+            return {"status": "new", "outputs": new_outputs}
+        if old_hashes == new_hashes:
+            return {"status": "unchanged", "count": len(new_hashes)}
+        
+        # Pair outputs by kind (output type and stream name) and occurrence, since
+        # stream outputs are always appended after rich outputs
+        def keyed(count: int, outputs: List[Dict]) -> Dict:
+            keys, seen = {}, {}
+            for i in range(count):
+                output = outputs[i] if i < len(outputs) else {}
+                kind = (output.get('output_type'), output.get('name'))
+                keys[kind + (seen.get(kind, 0),)] = i
+                seen[kind] = seen.get(kind, 0) + 1
+            return keys
+        
+        old_keys = keyed(len(old_hashes), old_outputs)
+        new_keys = keyed(len(new_hashes), new_outputs)
+        
+        changes = []
+        for key, i in new_keys.items():
+            new_output = new_outputs[i]
+            if key not in old_keys:
+                changes.append({"index": i, "status": "added", "output": new_output})
+                continue
+            j = old_keys[key]
+            if old_hashes[j] == new_hashes[i]:
+                continue
+            
+            old_output = old_outputs[j] if j < len(old_outputs) else {}
+            old_text = self._output_text(old_output) if old_output else None
+            new_text = self._output_text(new_output)
+            change = {"index": i, "status": "changed", "output_type": new_output.get('output_type')}
+            text_diff = ''
+            if old_text is not None and new_text is not None:
+                # lineterm='' so a last line without a newline (e.g. text/plain) stays on its own line
+                text_diff = '\n'.join(difflib.unified_diff(
+                    old_text.splitlines(), new_text.splitlines(),
+                    fromfile='previous', tofile='current', n=1, lineterm=''
+                ))
+            if text_diff:
+                change["diff"] = text_diff
+            
+            if 'data' in new_output:
+                if old_mime_hashes is not None and j < len(old_mime_hashes):
+                    old_mimes = old_mime_hashes[j]
+                else:
+                    old_mimes = self._fingerprint_data(old_output)
+                new_mimes = self._fingerprint_data(new_output)
+                changed_mimes = {m: h for m, h in new_mimes.items() if old_mimes.get(m) != h}
+                change["mime_types"] = list(new_mimes.keys())
+                change["changed_mime_types"] = changed_mimes
+                removed_mimes = [m for m in old_mimes if m not in new_mimes]
+                if removed_mimes:
+                    change["removed_mime_types"] = removed_mimes
+                # The text diff alone says nothing when e.g. only the image changed
+                if not text_diff:
+                    if changed_mimes:
+                        change["data"] = {m: new_output['data'][m] for m in changed_mimes}
+                    else:
+                        change["metadata"] = new_output.get('metadata', {})
+            elif not text_diff:
+                change["output"] = new_output
+            changes.append(change)
+        for key, j in old_keys.items():
+            if key not in new_keys:
+                changes.append({"previous_index": j, "status": "removed", "output_type": key[0]})
+        return {"status": "changed", "changes": changes}
+    
+    def submit_cell(self, cell_id: str, timeout: int = 30, diff: bool = False) -> Tuple[str, Future]:
+        """Queue a cell for execution and return its request id with a future for the result"""
+        request_id = str(uuid.uuid4())
+        future = self._execution_queue.submit(self._execute_request, request_id, cell_id, timeout, diff)
+        return request_id, future
+    
+    def run_cell(self, cell_id: str, timeout: int = 30, diff: bool = False) -> Dict:
+        """Execute a cell using the persistent kernel.
+        
+        With ``diff=True`` the full output list is replaced by an ``output_delta``
+        against the previous run, based on the hashes kept in the cell metadata.
+        """
+        _, future = self.submit_cell(cell_id, timeout, diff)
+        return future.result()
+    
+    def _execute_request(self, request_id: str, cell_id: str, timeout: int, diff: bool) -> Dict:
+        return {"request_id": request_id, **self._execute_cell(cell_id, timeout, diff)}
+    
+    def _abandon_request(self, msg_id: str, grace: float = 5) -> None:
+        """Interrupt a timed out request and drain its reply before the queue moves on.
+        
+        Otherwise the next request would read the stale reply, or be aborted by
+        the kernel because it arrived while the interrupted cell was failing.
+        """
+        self.kernel_provider.interrupt()
+        deadline = time.time() + grace
+        while time.time() < deadline:
+            try:
+                reply = self.kernel_client.get_shell_msg(timeout=max(deadline - time.time(), 0))
+            except queue.Empty:
+                break
+            if reply['parent_header'].get('msg_id') == msg_id:
+                break
+    
+    def _execute_cell(self, cell_id: str, timeout: int, diff: bool) -> Dict:
+        """Runs on the execution thread; the document is only locked around reads and writes of the cell"""
         if not self.kernel_ready:
             return {"success": False, "error": "Kernel not ready"}
         
-        cell = self.get_cell(cell_id)
-        if not cell or cell["cell_type"] != "code":
-            return {"success": False, "error": "Invalid cell or not a code cell"}
-        
-        source = '\n'.join(cell["source"]) if isinstance(cell["source"], list) else cell["source"]
+        with self._doc_lock.read_locked():
+            cell = self._get_live_cell(cell_id)
+            if not cell or cell["cell_type"] != "code":
+                return {"success": False, "error": "Invalid cell or not a code cell"}
+            
+            source = '\n'.join(cell["source"]) if isinstance(cell["source"], list) else cell["source"]
         
         if not source.strip():
             return {"success": True, "output": "", "error": ""}
         
         try:
-            # Execute the code
-            msg_id = self.kernel_client.execute(source, silent=False, store_history=True)
+            # Execute the code. Requests are already serialized by the execution
+            # queue; without stop_on_error=False the kernel briefly aborts whatever
+            # arrives after an error, e.g. the request following a timed out one
+            msg_id = self.kernel_client.execute(source, silent=False, store_history=True, stop_on_error=False)
             
             # Wait for the execute_reply message to get execution status
             try:
-                reply = self.kernel_client.get_shell_msg(timeout=timeout)
-                if reply['parent_header'].get('msg_id') != msg_id:
-                    return {"success": False, "error": "Message ID mismatch"}
+                deadline = time.time() + timeout
+                while True:
+                    try:
+                        reply = self.kernel_client.get_shell_msg(timeout=max(deadline - time.time(), 0))
+                    except queue.Empty:
+                        self._abandon_request(msg_id)
+                        return {"success": False, "error": f"Execution timed out after {timeout}s"}
+                    # Late replies from earlier timed out requests are discarded
+                    if reply['parent_header'].get('msg_id') == msg_id:
+                        break
                 
                 # Check if execution was successful
                 success = reply['content']['status'] == 'ok'
@@ -323,10 +591,6 @@ class NotebookController:
                     # Ignore message parsing errors
                     continue
             
-            # Update execution count
-            self.execution_count += 1
-            execution_count = self.execution_count
-            
             # Add stream outputs
             if stdout_text:
                 outputs.append({
@@ -342,13 +606,41 @@ class NotebookController:
                     'text': stderr_text
                 })
             
-            # Update cell with results
-            cell['execution_count'] = execution_count
-            cell['outputs'] = outputs
+            # Fingerprint outputs so re-runs can be reported as deltas
+            output_hashes = [self._fingerprint_output(output) for output in outputs]
+            output_mime_hashes = [self._fingerprint_data(output) for output in outputs]
+            
+            with self._doc_lock.write_locked():
+                # Update execution count
+                self.execution_count += 1
+                execution_count = self.execution_count
+                
+                # The cell may have been deleted while the kernel was busy
+                cell = self._get_live_cell(cell_id)
+                previous_hashes = cell.get('metadata', {}).get('output_hashes') if cell else None
+                previous_mime_hashes = cell.get('metadata', {}).get('output_mime_hashes') if cell else None
+                previous_outputs = self.output_cache.load_outputs(cell) if cell else []
+                
+                # Update cell with results
+                if cell:
+                    cell['execution_count'] = execution_count
+                    cell['outputs'] = outputs
+                    cell.setdefault('metadata', {})['output_hashes'] = output_hashes
+                    cell['metadata']['output_mime_hashes'] = output_mime_hashes
+                    self.output_cache.put(cell)
+                    self.save_notebook()
             
-            self.save_notebook()
             self._trigger_visual_update()
             
+            if diff:
+                return {
+                    'success': success,
+                    'execution_count': execution_count,
+                    'output_delta': self._diff_outputs(
+                        previous_outputs, previous_hashes, outputs, output_hashes, previous_mime_hashes
+                    )
+                }
+            
             return {
                 'success': success,
                 'output': stdout_text,
@@ -360,63 +652,73 @@ class NotebookController:
         except Exception as e:
             return {"success": False, "error": f"Execution failed: {str(e)}"}
     
-    def run_cells(self, cell_ids: List[str], timeout: int = 30) -> List[Dict]:
+    def run_cells(self, cell_ids: List[str], timeout: int = 30, diff: bool = False) -> List[Dict]:
         """Run multiple cells in sequence, maintaining state"""
         results = []
         for cell_id in cell_ids:
             print(f"Running cell: {cell_id}")
-            result = self.run_cell(cell_id, timeout)
+            result = self.run_cell(cell_id, timeout, diff)
             results.append({"cell_id": cell_id, **result})
             if not result["success"]:
                 print(f"Stopping execution due to error in cell: {cell_id}")
                 break
         return results
     
-    def run_all_cells(self, timeout: int = 30) -> List[Dict]:
+    def run_all_cells(self, timeout: int = 30, diff: bool = False) -> List[Dict]:
         """Run all code cells in the notebook"""
-        cell_ids = [cell["id"] for cell in self.notebook_data["cells"] 
-                   if cell["cell_type"] == "code"]
-        return self.run_cells(cell_ids, timeout)
+        with self._doc_lock.read_locked():
+            cell_ids = [cell["id"] for cell in self.notebook_data["cells"] 
+                       if cell["cell_type"] == "code"]
+        return self.run_cells(cell_ids, timeout, diff)
     
     def run_cells_from_index(self, start_index: int, end_index: Optional[int] = None, 
-                           timeout: int = 30) -> List[Dict]:
+                           timeout: int = 30, diff: bool = False) -> List[Dict]:
         """Run cells from a specific index range"""
-        if end_index is None:
-            end_index = len(self.notebook_data["cells"]) - 1
-        
-        cell_ids = []
-        for i in range(start_index, min(end_index + 1, len(self.notebook_data["cells"]))):
-            cell = self.notebook_data["cells"][i]
-            if cell["cell_type"] == "code":
-                cell_ids.append(cell["id"])
+        with self._doc_lock.read_locked():
+            if end_index is None:
+                end_index = len(self.notebook_data["cells"]) - 1
+            
+            cell_ids = []
+            for i in range(start_index, min(end_index + 1, len(self.notebook_data["cells"]))):
+                cell = self.notebook_data["cells"][i]
+                if cell["cell_type"] == "code":
+                    cell_ids.append(cell["id"])
         
-        return self.run_cells(cell_ids, timeout)
+        return self.run_cells(cell_ids, timeout, diff)
     
+    @_writes
     def clear_cell_output(self, cell_id: str) -> bool:
         """Clear output of a specific cell"""
-        cell = self.get_cell(cell_id)
+        cell = self._get_live_cell(cell_id)
         if cell and cell["cell_type"] == "code":
             cell["outputs"] = []
             cell["execution_count"] = None
+            cell.get("metadata", {}).pop("output_hashes", None)
+            cell.get("metadata", {}).pop("output_mime_hashes", None)
+            self.output_cache.discard(cell_id)
             self.save_notebook()
             self._trigger_visual_update()
             return True
         return False
     
+    @_writes
     def clear_all_outputs(self) -> None:
         """Clear all cell outputs"""
         for cell in self.notebook_data["cells"]:
             if cell["cell_type"] == "code":
                 cell["outputs"] = []
                 cell["execution_count"] = None
+                cell.get("metadata", {}).pop("output_hashes", None)
+                cell.get("metadata", {}).pop("output_mime_hashes", None)
+        self.output_cache.clear()
         self.save_notebook()
         self._trigger_visual_update()
         print("Cleared all outputs")
     
     def interrupt_kernel(self) -> None:
         """Interrupt the currently running kernel"""
-        if self.kernel_ready and self.kernel_manager:
-            self.kernel_manager.interrupt_kernel()
+        if self.kernel_ready:
+            self.kernel_provider.interrupt()
             print("⚡ Kernel interrupted")
     
     def get_kernel_info(self) -> Dict:
@@ -427,29 +729,31 @@ class NotebookController:
         # Get kernel ID safely
         kernel_id = None
         try:
-            if self.kernel_manager and hasattr(self.kernel_manager, 'kernel_id'):
-                kernel_id = self.kernel_manager.kernel_id
-            elif self.kernel_manager and hasattr(self.kernel_manager, 'get_kernel_id'):
-                kernel_id = self.kernel_manager.get_kernel_id()
+            kernel_id = self.kernel_provider.kernel_id
         except Exception:
             pass  # Ignore errors getting kernel ID
         
         return {
             "status": "ready",
             "kernel_id": kernel_id,
+            "host": self.kernel_provider.host_name,
             "execution_count": self.execution_count
         }
     
+    @_reads
     def get_cell_count(self) -> int:
         return len(self.notebook_data["cells"])
     
+    @_reads
     def get_cell_ids(self) -> List[str]:
         return list(self.cell_id_map.keys())
     
+    @_reads
     def get_code_cell_ids(self) -> List[str]:
         return [cell["id"] for cell in self.notebook_data["cells"] 
                 if cell["cell_type"] == "code"]
     
+    @_reads
     def get_cell_id_to_source_map(self) -> Dict[str, str]:
         """Return a mapping of cell IDs to their source content"""
         return {
@@ -457,6 +761,7 @@ class NotebookController:
             for cell in self.notebook_data["cells"]
         }
     
+    @_writes
     def duplicate_cell(self, cell_id: str) -> Optional[str]:
         cell = self.get_cell(cell_id)
         if not cell:
@@ -465,6 +770,7 @@ class NotebookController:
         new_cell_id = self._generate_cell_id()
         new_cell = cell.copy()
         new_cell["id"] = new_cell_id
+        new_cell["metadata"] = {k: v for k, v in cell.get("metadata", {}).items() if k not in ("output_hashes", "output_mime_hashes")}
         
         if new_cell["cell_type"] == "code":
             new_cell["execution_count"] = None
@@ -480,8 +786,9 @@ class NotebookController:
         print(f"Duplicated cell {cell_id} as {new_cell_id}")
         return new_cell_id
     
+    @_writes
     def set_cell_metadata(self, cell_id: str, metadata: Dict) -> bool:
-        cell = self.get_cell(cell_id)
+        cell = self._get_live_cell(cell_id)
         if cell:
             cell["metadata"] = metadata
             self.save_notebook()
@@ -489,9 +796,11 @@ class NotebookController:
             return True
         return False
     
+    @_reads
     def get_notebook_metadata(self) -> Dict:
         return self.notebook_data.get("metadata", {})
     
+    @_writes
     def set_notebook_metadata(self, metadata: Dict) -> None:
         self.notebook_data["metadata"] = metadata
         self.save_notebook()
@@ -505,19 +814,34 @@ class NotebookController:
             base_name = os.path.splitext(self.notebook_path)[0]
             output_path = f"{base_name}.{format_type}"
         
+        snapshot_dir = None
         try:
+            # Convert a snapshot so saves (and the writers waiting on them) are
+            # only held up for the copy, not for the whole nbconvert run. It keeps
+            # the notebook's file name, which nbconvert uses as the document title.
+            snapshot_dir = tempfile.mkdtemp(prefix="notebook_export_")
+            snapshot_path = os.path.join(snapshot_dir, os.path.basename(self.notebook_path))
+            with self._file_lock:
+                shutil.copyfile(self.notebook_path, snapshot_path)
+            # nbconvert writes relative to the input's directory, so give it the real destination
+            output_path = os.path.abspath(output_path)
             subprocess.run([
                 "jupyter", "nbconvert", 
                 f"--to={format_type}",
-                f"--output={output_path}",
-                self.notebook_path
+                f"--output-dir={os.path.dirname(output_path)}",
+                f"--output={os.path.basename(output_path)}",
+                snapshot_path
             ], check=True)
             print(f"Exported to {format_type}: {output_path}")
             return True
         except Exception as e:
             print(f"Export failed: {e}")
             return False
+        finally:
+            if snapshot_dir:
+                shutil.rmtree(snapshot_dir, ignore_errors=True)
     
+    @_reads
     def get_notebook_info(self) -> Dict:
         cells = self.notebook_data["cells"]
         code_cells = [c for c in cells if c["cell_type"] == "code"]
@@ -534,13 +858,26 @@ class NotebookController:
             "nbformat": self.notebook_data.get("nbformat", "Unknown"),
             "kernel": self.notebook_data.get("metadata", {}).get("kernelspec", {}).get("name", "Unknown"),
             "kernel_status": kernel_info["status"],
-            "execution_count": self.execution_count
+            "execution_count": self.execution_count,
+            "output_cache": self.output_cache.get_stats()
         }
     
+    def close(self) -> None:
+        """Stop the kernel, give its scheduler slot back and drop spilled outputs"""
+        if getattr(self, '_closed', True):
+            return
+        self._closed = True
+        if self.kernel_ready:
+            self.stop_kernel()
+        if self._holds_slot:
+            self.kernel_scheduler.release(self.kernel_provider)
+            self._holds_slot = False
+        self.output_cache.cleanup()
+        self._execution_queue.shutdown(wait=False)
+    
     def __del__(self):
         """Cleanup kernel when object is destroyed"""
-        if hasattr(self, 'kernel_ready') and self.kernel_ready:
-            self.stop_kernel()
+        self.close()
     
     def __str__(self) -> str:
         info = self.get_notebook_info()
@@ -1,7 +1,8 @@
 from datetime import datetime
-from typing import Optional, Type
+from typing import Dict, List, Optional, Type
 from pydantic import BaseModel, Field
 from modules.notebook_controller import NotebookController
+from modules.dataset_manager import DatasetManager
 from crewai.tools import BaseTool
 
 
@@ -9,6 +10,7 @@ def get_formatted_date()->str:
     return "_".join(datetime.now().strftime("%B %d %Y %H %M %S").split(" "))
     
 notebook = NotebookController(f"{get_formatted_date()}.ipynb")
+datasets = DatasetManager()
 
 # Define input schemas for each tool
 class InsertAndRunCellInput(BaseModel):
@@ -30,6 +32,21 @@ class UpdateCellSourceInput(BaseModel):
 class DeleteCellInput(BaseModel):
     cell_id: str = Field(description="ID of the cell to delete")
 
+class ConvertDatasetInput(BaseModel):
+    csv_path: str = Field(description="Path of the CSV file to convert")
+    name: Optional[str] = Field(None, description="Name of the cached dataset, defaults to the file name")
+    kinds: Optional[Dict[str, str]] = Field(None, description="Per-column override, 'numeric' or 'categorical', e.g. when conversion reports a non-numeric value")
+
+class SampleDatasetInput(BaseModel):
+    name: str = Field(description="Name of the cached dataset")
+    n: int = Field(20, description="Number of rows to sample")
+    columns: Optional[List[str]] = Field(None, description="Columns to include, defaults to all")
+
+class SummarizeDatasetInput(BaseModel):
+    name: str = Field(description="Name of the cached dataset")
+    columns: Optional[List[str]] = Field(None, description="Columns to summarize, defaults to all")
+    bins: int = Field(20, description="Number of histogram bins for numeric columns")
+
 class InsertAndRunCellTool(BaseTool):
     name: str = "insert_and_run_cell"
     description: str = "Insert a new cell and run it into the notebook."
@@ -42,19 +59,19 @@ class InsertAndRunCellTool(BaseTool):
 
 class RunCellTool(BaseTool):
     name: str = "run_cell"
-    description: str = "Run a specific code cell by its ID."
+    description: str = "Run a specific code cell by its ID. Outputs are reported as a delta against the previous run (unchanged, changed or new)."
     args_schema: Type[BaseModel] = RunCellInput
 
     def _run(self, cell_id: str, timeout: int = 30) -> dict:
-        return notebook.run_cell(cell_id, timeout)
+        return notebook.run_cell(cell_id, timeout, diff=True)
 
 class RunAllCellsTool(BaseTool):
     name: str = "run_all_cells"
-    description: str = "Run all code cells in the notebook."
+    description: str = "Run all code cells in the notebook. Outputs are reported per cell as a delta against the previous run."
     args_schema: Type[BaseModel] = RunAllCellsInput
 
     def _run(self, timeout: int = 30) -> list:
-        return notebook.run_all_cells(timeout)
+        return notebook.run_all_cells(timeout, diff=True)
 
 class UpdateCellSourceTool(BaseTool):
     name: str = "update_cell_source"
@@ -93,6 +110,35 @@ class RestartKernelTool(BaseTool):
     def _run(self) -> None:
         return notebook.restart_kernel()
 
+class ConvertDatasetTool(BaseTool):
+    name: str = "convert_dataset"
+    description: str = (
+        "Convert a large CSV once into a memory-mapped columnar cache. "
+        "Inside the notebook load it lazily with "
+        "`from modules.dataset_manager import DatasetManager` and "
+        "`DatasetManager().read_rows/iter_chunks/sample(name, ...)` instead of pd.read_csv."
+    )
+    args_schema: Type[BaseModel] = ConvertDatasetInput
+
+    def _run(self, csv_path: str, name: Optional[str] = None, kinds: Optional[Dict[str, str]] = None) -> dict:
+        return datasets.convert_csv(csv_path, name, kinds=kinds)
+
+class SampleDatasetTool(BaseTool):
+    name: str = "sample_dataset"
+    description: str = "Return a random sample of rows from a cached dataset."
+    args_schema: Type[BaseModel] = SampleDatasetInput
+
+    def _run(self, name: str, n: int = 20, columns: Optional[List[str]] = None) -> str:
+        return datasets.sample(name, n, columns).to_string()
+
+class SummarizeDatasetTool(BaseTool):
+    name: str = "summarize_dataset"
+    description: str = "Out-of-core summary of a cached dataset: nulls, moments, histograms, top categories and correlations."
+    args_schema: Type[BaseModel] = SummarizeDatasetInput
+
+    def _run(self, name: str, columns: Optional[List[str]] = None, bins: int = 20) -> dict:
+        return datasets.summarize(name, columns, bins)
+
 # CrewAI expects these to be directly passed as a list
 NOTEBOOK_TOOLS = [
     InsertAndRunCellTool(),
@@ -103,4 +149,7 @@ NOTEBOOK_TOOLS = [
     GetNotebookInfoTool(),
     GetCellIdsToSourceMapTool(),
     RestartKernelTool(),
+    ConvertDatasetTool(),
+    SampleDatasetTool(),
+    SummarizeDatasetTool(),
 ]
\ No newline at end of file
@@ -2,8 +2,10 @@ import uuid
 from langchain.tools import tool
 from typing import Optional, List, Dict, Any
 from modules.notebook_controller import NotebookController
+from modules.dataset_manager import DatasetManager
 
 notebook = NotebookController(f"{str(uuid.uuid4())}.ipynb")
+datasets = DatasetManager()
 
 @tool
 def insert_cell_tool(cell_type: str = "code", source: str = "", index: Optional[int] = None) -> str:
@@ -13,9 +15,9 @@ def insert_cell_tool(cell_type: str = "code", source: str = "", index: Optional[
 
 @tool
 def run_cell_tool(cell_id: str, timeout: int = 30) -> Dict[str, Any]:
-    """Execute a code cell by cell ID."""
+    """Execute a code cell by cell ID, reporting outputs as a delta against the previous run."""
     print(f"[TOOL] run_cell_tool called with: cell_id={cell_id}, timeout={timeout}")
-    return notebook.run_cell(cell_id=cell_id, timeout=timeout)
+    return notebook.run_cell(cell_id=cell_id, timeout=timeout, diff=True)
 
 @tool
 def insert_and_run_cell_tool(cell_type: str = "code", source: str = "", index: Optional[int] = None) -> Dict[str, Any]:
@@ -29,9 +31,9 @@ def insert_and_run_cell_tool(cell_type: str = "code", source: str = "", index: O
 
 @tool
 def run_all_cells_tool(timeout: int = 30) -> List[Dict[str, Any]]:
-    """Execute all code cells in the notebook."""
+    """Execute all code cells in the notebook, reporting outputs per cell as a delta against the previous run."""
     print(f"[TOOL] run_all_cells_tool called with: timeout={timeout}")
-    return notebook.run_all_cells(timeout=timeout)
+    return notebook.run_all_cells(timeout=timeout, diff=True)
 
 @tool
 def update_cell_source_tool(cell_id: str, source: str) -> bool:
@@ -57,6 +59,24 @@ def get_cellIds_code_map_tool() -> Dict[str, Any]:
     print(f"[TOOL] get_cellIds_code_map called")
     return notebook.get_cell_id_to_source_map()
 
+@tool
+def convert_dataset_tool(csv_path: str, name: Optional[str] = None, kinds: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+    """Convert a large CSV once into a memory-mapped columnar cache for lazy loading in the notebook. Use kinds to force a column to 'numeric' or 'categorical'."""
+    print(f"[TOOL] convert_dataset_tool called with: csv_path={csv_path}, name={name}, kinds={kinds}")
+    return datasets.convert_csv(csv_path, name, kinds=kinds)
+
+@tool
+def sample_dataset_tool(name: str, n: int = 20, columns: Optional[List[str]] = None) -> str:
+    """Return a random sample of rows from a cached dataset."""
+    print(f"[TOOL] sample_dataset_tool called with: name={name}, n={n}, columns={columns}")
+    return datasets.sample(name, n, columns).to_string()
+
+@tool
+def summarize_dataset_tool(name: str, columns: Optional[List[str]] = None, bins: int = 20) -> Dict[str, Any]:
+    """Out-of-core summary of a cached dataset: nulls, moments, histograms and correlations."""
+    print(f"[TOOL] summarize_dataset_tool called with: name={name}, columns={columns}, bins={bins}")
+    return datasets.summarize(name, columns, bins)
+
 
 NOTEBOOK_TOOLS = [
     insert_and_run_cell_tool,
@@ -65,4 +85,7 @@ NOTEBOOK_TOOLS = [
     update_cell_source_tool,
     delete_cell_tool,
     get_notebook_info_tool,
+    convert_dataset_tool,
+    sample_dataset_tool,
+    summarize_dataset_tool,
 ]
\ No newline at end of file
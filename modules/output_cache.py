@@ -0,0 +1,119 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+
+class OutputCache:
+    """Memory budget for code cell outputs with LRU eviction to disk.
+
+    Resident cells keep their ``outputs`` in the notebook document as usual.
+    Once the resident outputs exceed ``max_bytes``, the least recently used
+    cells have their outputs written to ``spill_dir`` and replaced by an empty
+    list in the document; ``load_outputs`` reads them back without making them
+    resident again. A cell becomes resident again when its outputs are
+    rewritten (``put``). ``max_bytes=None`` disables eviction.
+    All public methods are safe to call from several threads.
+    """
+
+    def __init__(self, max_bytes: Optional[int] = 64 * 1024 * 1024, spill_dir: Optional[str] = None):
+        self.max_bytes = max_bytes
+        self.spill_dir = spill_dir
+        self._owns_spill_dir = spill_dir is None
+        self._resident: "OrderedDict[str, tuple]" = OrderedDict()
+        self._evicted: Dict[str, str] = {}
+        self.resident_bytes = 0
+        self._lock = threading.RLock()
+
+    def _spill_path(self, cell_id: str) -> str:
+        if self.spill_dir is None:
+            self.spill_dir = tempfile.mkdtemp(prefix="notebook_outputs_")
+        os.makedirs(self.spill_dir, exist_ok=True)
+        # Cell ids come from the loaded notebook, so never use them as a path
+        digest = hashlib.sha256(cell_id.encode('utf-8')).hexdigest()
+        return os.path.join(self.spill_dir, f"{digest}.json")
+
+    @staticmethod
+    def _measure(outputs: List[Dict]) -> int:
+        return len(json.dumps(outputs, ensure_ascii=False).encode('utf-8'))
+
+    def put(self, cell: Dict) -> None:
+        """Track a cell whose outputs were just (re)written"""
+        with self._lock:
+            cell_id = cell["id"]
+            self.discard(cell_id)
+            outputs = cell.get("outputs") or []
+            if not outputs:
+                return
+            size = self._measure(outputs)
+            self._resident[cell_id] = (cell, size)
+            self.resident_bytes += size
+            self._evict()
+
+    def touch(self, cell_id: str) -> None:
+        """Mark a resident cell as most recently used"""
+        with self._lock:
+            if cell_id in self._resident:
+                self._resident.move_to_end(cell_id)
+
+    def load_outputs(self, cell: Dict) -> List[Dict]:
+        """Return a cell's outputs without changing what is resident"""
+        with self._lock:
+            path = self._evicted.get(cell.get("id"))
+            if path is None:
+                return cell.get("outputs", [])
+            with open(path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+
+    def is_evicted(self, cell_id: str) -> bool:
+        with self._lock:
+            return cell_id in self._evicted
+
+    def _evict(self) -> None:
+        if self.max_bytes is None:
+            return
+        # Always keep the most recent cell resident, even if it alone is over budget
+        while self.resident_bytes > self.max_bytes and len(self._resident) > 1:
+            cell_id, (cell, size) = self._resident.popitem(last=False)
+            path = self._spill_path(cell_id)
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump(cell.get("outputs", []), f, ensure_ascii=False)
+            cell["outputs"] = []
+            self._evicted[cell_id] = path
+            self.resident_bytes -= size
+
+    def discard(self, cell_id: str) -> None:
+        """Forget a cell, e.g. after it was deleted or its outputs cleared"""
+        with self._lock:
+            if cell_id in self._resident:
+                _, size = self._resident.pop(cell_id)
+                self.resident_bytes -= size
+            path = self._evicted.pop(cell_id, None)
+            if path and os.path.exists(path):
+                os.remove(path)
+
+    def clear(self) -> None:
+        with self._lock:
+            for cell_id in list(self._resident) + list(self._evicted):
+                self.discard(cell_id)
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            return {
+                "max_bytes": self.max_bytes,
+                "resident_bytes": self.resident_bytes,
+                "resident_cells": len(self._resident),
+                "evicted_cells": len(self._evicted),
+            }
+
+    def cleanup(self) -> None:
+        """Remove every spilled output from disk"""
+        with self._lock:
+            self.clear()
+            if self._owns_spill_dir and self.spill_dir and os.path.exists(self.spill_dir):
+                shutil.rmtree(self.spill_dir, ignore_errors=True)
+                self.spill_dir = None
@@ -0,0 +1,82 @@
+import threading
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional
+
+
+class ReadWriteLock:
+    """Many concurrent readers or one writer, with writers preferred.
+
+    Both sides are reentrant per thread, and the thread holding the write
+    lock may also take the read lock, so locked methods can call each other.
+    Upgrading a held read lock to a write lock is refused because two
+    upgrading readers would deadlock.
+    """
+
+    def __init__(self):
+        self._cond = threading.Condition(threading.Lock())
+        self._readers: Dict[int, int] = {}
+        self._writer: Optional[int] = None
+        self._write_depth = 0
+        self._writers_waiting = 0
+
+    def acquire_read(self) -> None:
+        me = threading.get_ident()
+        with self._cond:
+            if self._writer != me and me not in self._readers:
+                while self._writer is not None or self._writers_waiting:
+                    self._cond.wait()
+            self._readers[me] = self._readers.get(me, 0) + 1
+
+    def release_read(self) -> None:
+        me = threading.get_ident()
+        with self._cond:
+            count = self._readers.get(me, 0)
+            if not count:
+                raise RuntimeError("Read lock released by a thread that does not hold it")
+            if count == 1:
+                del self._readers[me]
+                self._cond.notify_all()
+            else:
+                self._readers[me] = count - 1
+
+    def acquire_write(self) -> None:
+        me = threading.get_ident()
+        with self._cond:
+            if self._writer == me:
+                self._write_depth += 1
+                return
+            if me in self._readers:
+                raise RuntimeError("Cannot upgrade a read lock to a write lock")
+            self._writers_waiting += 1
+            try:
+                while self._writer is not None or self._readers:
+                    self._cond.wait()
+            finally:
+                self._writers_waiting -= 1
+            self._writer = me
+            self._write_depth = 1
+
+    def release_write(self) -> None:
+        with self._cond:
+            if self._writer != threading.get_ident():
+                raise RuntimeError("Write lock released by a thread that does not hold it")
+            self._write_depth -= 1
+            if not self._write_depth:
+                self._writer = None
+                self._cond.notify_all()
+
+    @contextmanager
+    def read_locked(self) -> Iterator[None]:
+        self.acquire_read()
+        try:
+            yield
+        finally:
+            self.release_read()
+
+    @contextmanager
+    def write_locked(self) -> Iterator[None]:
+        self.acquire_write()
+        try:
+            yield
+        finally:
+            self.release_write()
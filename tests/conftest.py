@@ -0,0 +1,12 @@
+import pytest
+
+
+@pytest.fixture
+def notebook(tmp_path):
+    pytest.importorskip("ipykernel")
+    from modules.notebook_controller import NotebookController
+
+    nb = NotebookController(str(tmp_path / "test.ipynb"))
+    assert nb.kernel_ready
+    yield nb
+    nb.close()
@@ -0,0 +1,101 @@
+import json
+import threading
+import time
+
+import pytest
+
+pytest.importorskip("ipykernel")
+
+from modules.rw_lock import ReadWriteLock
+
+
+def test_rw_lock_readers_share_and_writers_exclude():
+    lock = ReadWriteLock()
+    inside = []
+
+    def reader():
+        with lock.read_locked():
+            inside.append(1)
+            time.sleep(0.2)
+
+    threads = [threading.Thread(target=reader) for _ in range(3)]
+    start = time.time()
+    for t in threads:
+        t.start()
+    time.sleep(0.05)
+    with lock.write_locked():
+        # Only reached once every reader has left
+        assert len(inside) == 3
+        # Reentrant for the writer, including reads
+        with lock.write_locked(), lock.read_locked():
+            pass
+    for t in threads:
+        t.join()
+    assert time.time() - start < 0.6
+
+
+def test_rw_lock_refuses_upgrade():
+    lock = ReadWriteLock()
+    with lock.read_locked():
+        with pytest.raises(RuntimeError):
+            lock.acquire_write()
+
+
+def test_reads_do_not_block_during_long_execution(notebook):
+    slow = notebook.insert_cell("code", "import time; time.sleep(2); print('slept')")
+    request_id, future = notebook.submit_cell(slow)
+    time.sleep(0.3)
+
+    start = time.time()
+    sources = notebook.get_cell_id_to_source_map()
+    notebook.get_cell(slow)
+    notebook.get_notebook_info()
+    assert time.time() - start < 0.5
+    assert not future.done()
+
+    result = future.result()
+    assert result["request_id"] == request_id
+    assert result["outputs"][0]["text"] == "slept\n"
+    assert slow in sources
+
+
+def test_concurrent_inserts_and_runs(notebook, tmp_path):
+    results, errors = {}, []
+
+    def work(i):
+        try:
+            cell_id = notebook.insert_cell("code", f"print({i} * {i})", index=0 if i % 2 else None)
+            results[i] = notebook.run_cell(cell_id)
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=work, args=(i,)) for i in range(16)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert not errors
+    for i, result in results.items():
+        assert result["success"]
+        assert result["outputs"][0]["text"].strip() == str(i * i)
+    assert len({r["request_id"] for r in results.values()}) == 16
+
+    # Indices and the file stay consistent with the document
+    assert sorted(notebook.cell_id_map.values()) == list(range(16))
+    saved = json.load(open(notebook.notebook_path, encoding="utf-8"))
+    assert [c["id"] for c in saved["cells"]] == notebook.get_cell_ids()
+    assert all(c["outputs"] for c in saved["cells"])
+
+
+def test_timed_out_run_does_not_leak_into_next_request(notebook):
+    slow = notebook.insert_cell("code", "import time; time.sleep(3)")
+    fast = notebook.insert_cell("code", "print('fast')")
+
+    timed_out = notebook.run_cell(slow, timeout=1)
+    assert not timed_out["success"]
+    assert "timed out" in timed_out["error"]
+
+    result = notebook.run_cell(fast)
+    assert result["success"], result
+    assert result["output"] == "fast\n"
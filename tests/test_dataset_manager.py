@@ -0,0 +1,155 @@
+import json
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from modules.dataset_manager import DatasetManager
+
+
+@pytest.fixture
+def manager(tmp_path):
+    # Small chunks so every test runs through the chunked paths
+    return DatasetManager(str(tmp_path / "cache"), chunk_rows=7)
+
+
+def write_csv(path, frame):
+    frame.to_csv(path, index=False)
+    return str(path)
+
+
+def test_summary_matches_pandas_across_chunks(manager, tmp_path):
+    rng = np.random.default_rng(0)
+    frame = pd.DataFrame({
+        # Large offset: a naive sum of squares loses the variance entirely
+        "ts": 1.7e9 + rng.normal(0, 2, 50),
+        "x": rng.normal(5, 3, 50),
+        "city": rng.choice(["paris", "oslo", "rome"], 50),
+    })
+    frame["y"] = frame["x"] * 2 + rng.normal(0, 1, 50)
+    frame.loc[[3, 20], "x"] = np.nan
+    csv = write_csv(tmp_path / "data.csv", frame)
+
+    manager.convert_csv(csv)
+    summary = manager.summarize("data", bins=5)
+
+    for column in ("ts", "x", "y"):
+        stats = summary["numeric"][column]
+        expected = frame[column].dropna()
+        assert stats["count"] == len(expected)
+        assert stats["mean"] == pytest.approx(expected.mean())
+        assert stats["std"] == pytest.approx(expected.std(ddof=0), rel=1e-6)
+        assert sum(stats["histogram"]["counts"]) == len(expected)
+    assert summary["nulls"]["x"] == 2
+
+    complete = frame[["ts", "x", "y"]].dropna()
+    assert summary["correlations"]["x"]["y"] == pytest.approx(complete["x"].corr(complete["y"]), abs=1e-6)
+    assert summary["categorical"]["city"]["top"] == frame["city"].value_counts().to_dict()
+
+
+def test_merge_moments_matches_single_pass():
+    rng = np.random.default_rng(1)
+    data = rng.normal(100, 10, (40, 3))
+    count, mean, m2 = 0, np.zeros(3), np.zeros((3, 3))
+    for chunk in np.array_split(data, [1, 5, 6, 30]):
+        count, mean, m2 = DatasetManager._merge_moments(count, mean, m2, chunk)
+
+    centered = data - data.mean(axis=0)
+    assert count == 40
+    np.testing.assert_allclose(mean, data.mean(axis=0))
+    np.testing.assert_allclose(m2, centered.T @ centered)
+
+
+def test_infinite_values_stay_out_of_the_summary(manager, tmp_path):
+    csv = tmp_path / "inf.csv"
+    csv.write_text("a,b\n1,2\n2,4\ninf,5\n-Infinity,\n3,7\n")
+
+    manager.convert_csv(str(csv))
+    summary = manager.summarize("inf", bins=2)
+
+    a = summary["numeric"]["a"]
+    assert (a["count"], a["infinite"], a["min"], a["max"]) == (3, 2, 1.0, 3.0)
+    assert a["mean"] == pytest.approx(2.0)
+    assert a["histogram"] == {"edges": [1.0, 2.0, 3.0], "counts": [1, 2]}
+    assert summary["nulls"] == {"a": 0, "b": 1}
+    json.dumps(summary, allow_nan=False)
+
+
+def test_constant_column_has_no_correlation(manager, tmp_path):
+    csv = write_csv(tmp_path / "flat.csv", pd.DataFrame({"a": [1.0] * 10, "b": range(10)}))
+
+    manager.convert_csv(csv)
+    summary = manager.summarize("flat")
+
+    assert summary["correlations"]["a"]["b"] is None
+    json.dumps(summary, allow_nan=False)
+
+
+def test_categorical_values_round_trip(manager, tmp_path):
+    frame = pd.DataFrame({"code": ["007", "5", None, "a long value", "5"] * 4, "n": range(20)})
+    csv = write_csv(tmp_path / "codes.csv", frame)
+
+    info = manager.convert_csv(csv)
+    assert info["kinds"] == {"code": "categorical", "n": "numeric"}
+
+    rows = manager.read_rows("codes")
+    assert rows["code"].isna().tolist() == frame["code"].isna().tolist()
+    assert rows["code"].dropna().tolist() == frame["code"].dropna().tolist()
+    chunks = list(manager.iter_chunks("codes", chunk_rows=6))
+    assert [len(chunk) for chunk in chunks] == [6, 6, 6, 2]
+    assert chunks[1].index[0] == 6
+    assert sorted(manager.get_vocabulary("codes", "code")) == ["007", "5", "a long value"]
+    assert "vocabularies" not in manager.get_meta("codes")
+
+
+def test_later_non_numeric_value_is_refused(manager, tmp_path):
+    csv = write_csv(tmp_path / "mixed.csv", pd.DataFrame({"v": [str(i) for i in range(10)] + ["n/a?"]}))
+
+    with pytest.raises(ValueError, match="kinds="):
+        manager.convert_csv(csv)
+    assert manager.list_datasets() == []
+
+    info = manager.convert_csv(csv, kinds={"v": "categorical"})
+    assert info["kinds"] == {"v": "categorical"}
+
+
+def test_cache_is_reused_only_for_the_same_source_and_kinds(manager, tmp_path):
+    csv = write_csv(tmp_path / "t.csv", pd.DataFrame({"t": ["1", "2", "3"]}))
+    assert manager.convert_csv(csv)["kinds"] == {"t": "numeric"}
+
+    assert manager.convert_csv(csv, kinds={"t": "categorical"})["kinds"] == {"t": "categorical"}
+    assert manager.read_rows("t")["t"].tolist() == ["1", "2", "3"]
+    # Kinds for columns the CSV does not have are ignored, as during conversion
+    before = os.path.getmtime(os.path.join(manager.cache_dir, "t", DatasetManager.META_FILE))
+    manager.convert_csv(csv, kinds={"t": "categorical", "typo": "numeric"})
+    assert os.path.getmtime(os.path.join(manager.cache_dir, "t", DatasetManager.META_FILE)) == before
+
+    other = tmp_path / "other"
+    other.mkdir()
+    moved = write_csv(other / "t.csv", pd.DataFrame({"t": ["4", "5"]}))
+    assert manager.convert_csv(moved)["rows"] == 2
+
+
+def test_meta_is_parsed_once_per_conversion(manager, tmp_path, monkeypatch):
+    csv = write_csv(tmp_path / "big.csv", pd.DataFrame({"c": [f"v{i}" for i in range(30)], "n": range(30)}))
+    manager.convert_csv(csv)
+
+    loads = []
+    original = json.load
+    monkeypatch.setattr(json, "load", lambda f: loads.append(f.name) or original(f))
+    for _ in manager.iter_chunks("big", chunk_rows=5):
+        pass
+    manager.read_rows("big", 0, 10)
+    manager.summarize("big")
+    assert loads == []
+
+    manager.drop_dataset("big")
+    with pytest.raises(FileNotFoundError):
+        manager.read_rows("big")
+
+
+@pytest.mark.parametrize("name", ["", ".", "..", "../escape", "a/b", "/tmp/abs"])
+def test_names_cannot_leave_the_cache(manager, name):
+    with pytest.raises(ValueError):
+        manager.get_meta(name)
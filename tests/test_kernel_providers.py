@@ -0,0 +1,143 @@
+import os
+import subprocess
+import sys
+import time
+
+import pytest
+
+pytest.importorskip("ipykernel")
+
+from modules.kernel_providers import (
+    ConnectionFileHost,
+    KernelHost,
+    KernelProvider,
+    KernelScheduler,
+    LocalKernelProvider,
+    RemoteKernelProvider,
+)
+from modules.notebook_controller import NotebookController
+
+
+def launch_kernel(connection_file):
+    """Start a kernel in a separate process, like one running on another node"""
+    process = subprocess.Popen(
+        [sys.executable, "-m", "ipykernel_launcher", "-f", str(connection_file)],
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    deadline = time.time() + 20
+    while not os.path.exists(connection_file) and time.time() < deadline:
+        time.sleep(0.1)
+    assert os.path.exists(connection_file), "kernel did not write its connection file"
+    return process
+
+
+@pytest.fixture
+def remote_kernel(tmp_path):
+    connection_file = tmp_path / "kernel-remote.json"
+    process = launch_kernel(connection_file)
+    yield str(connection_file), process
+    process.kill()
+    process.wait()
+
+
+def test_remote_provider_executes_in_the_other_process(remote_kernel, tmp_path):
+    connection_file, process = remote_kernel
+    nb = NotebookController(str(tmp_path / "remote.ipynb"),
+                            kernel_provider=RemoteKernelProvider(connection_file))
+    try:
+        assert nb.kernel_ready
+        result = nb.run_cell(nb.insert_cell("code", "import os; os.getpid()"))
+        assert result["outputs"][0]["data"]["text/plain"] == str(process.pid)
+        assert nb.get_kernel_info()["kernel_id"] == "remote"
+
+        nb.run_cell(nb.insert_cell("code", "x = 1"))
+        nb.restart_kernel()
+        result = nb.run_cell(nb.insert_cell("code", "x"))
+        assert not result["success"]
+        assert "NameError" in result["error"]
+    finally:
+        nb.close()
+    # Detaching leaves the remote kernel running
+    assert process.poll() is None
+
+
+def test_remote_provider_detaches_when_reset_fails(remote_kernel, monkeypatch):
+    connection_file, process = remote_kernel
+    provider = RemoteKernelProvider(connection_file)
+
+    def busy():
+        raise TimeoutError("kernel is busy")
+
+    monkeypatch.setattr(provider, "_reset_namespace", busy)
+    with pytest.raises(TimeoutError):
+        provider.start()
+    assert not provider.kernel_client.channels_running
+    assert process.poll() is None
+
+
+def test_pooled_remote_kernel_does_not_leak_namespace(remote_kernel, tmp_path):
+    connection_file, _ = remote_kernel
+    scheduler = KernelScheduler([ConnectionFileHost("remote", [connection_file])])
+
+    first = NotebookController(str(tmp_path / "first.ipynb"), kernel_scheduler=scheduler)
+    first.run_cell(first.insert_cell("code", "secret = 42"))
+    first.close()
+    assert scheduler.get_load()["remote"]["active"] == 0
+
+    second = NotebookController(str(tmp_path / "second.ipynb"), kernel_scheduler=scheduler)
+    try:
+        result = second.run_cell(second.insert_cell("code", "print(secret)"))
+        assert "NameError" in result["error"]
+    finally:
+        second.close()
+
+
+def test_provider_interface_is_abstract():
+    with pytest.raises(TypeError):
+        KernelProvider()
+
+
+class DummyProvider(KernelProvider):
+    def start(self):
+        pass
+
+    def stop(self):
+        pass
+
+    def interrupt(self):
+        pass
+
+
+def test_scheduler_places_on_least_loaded_host():
+    small = KernelHost("small", DummyProvider, capacity=2)
+    big = KernelHost("big", DummyProvider, capacity=8)
+    uncapped = KernelHost("uncapped", DummyProvider)
+    scheduler = KernelScheduler([small, big, uncapped])
+
+    providers = [scheduler.acquire() for _ in range(6)]
+    load = scheduler.get_load()
+    assert [load[name]["active"] for name in ("small", "big", "uncapped")] == [1, 4, 1]
+
+    for provider in providers:
+        scheduler.release(provider)
+    assert all(host["active"] == 0 for host in scheduler.get_load().values())
+
+
+def test_scheduler_fails_over_when_a_kernel_cannot_start(tmp_path):
+    dead_file = tmp_path / "kernel-dead.json"
+    process = launch_kernel(dead_file)
+    process.kill()
+    process.wait()
+
+    scheduler = KernelScheduler([
+        ConnectionFileHost("dead", [str(dead_file)], ready_timeout=2),
+        KernelHost("local", LocalKernelProvider, capacity=1),
+    ])
+    nb = NotebookController(str(tmp_path / "failover.ipynb"), kernel_scheduler=scheduler)
+    try:
+        assert nb.kernel_ready
+        assert nb.get_kernel_info()["host"] == "local"
+        assert scheduler.get_load()["dead"]["active"] == 0
+    finally:
+        nb.close()
+    assert scheduler.get_load()["local"]["active"] == 0
@@ -0,0 +1,89 @@
+import json
+import os
+
+import pytest
+
+from modules.output_cache import OutputCache
+
+
+def code_cell(cell_id, text):
+    return {"id": cell_id, "cell_type": "code", "metadata": {}, "source": "",
+            "outputs": [{"output_type": "stream", "name": "stdout", "text": text}]}
+
+
+def test_least_recently_used_cells_spill_and_reload(tmp_path):
+    cache = OutputCache(max_bytes=400, spill_dir=str(tmp_path))
+    cells = [code_cell(name, name * 100) for name in "abc"]
+    cache.put(cells[0])
+    cache.put(cells[1])
+    cache.touch("a")
+    cache.put(cells[2])
+
+    # "b" was least recently used; "c" is always kept as the newest
+    assert cache.is_evicted("b") and not cache.is_evicted("a") and not cache.is_evicted("c")
+    assert cells[1]["outputs"] == []
+    assert cache.load_outputs(cells[1])[0]["text"] == "b" * 100
+    assert cache.get_stats()["evicted_cells"] == 1
+
+    cache.discard("b")
+    assert os.listdir(tmp_path) == []
+
+
+def test_newest_cell_stays_resident_over_budget(tmp_path):
+    cache = OutputCache(max_bytes=10, spill_dir=str(tmp_path))
+    cell = code_cell("big", "x" * 1000)
+    cache.put(cell)
+
+    assert not cache.is_evicted("big")
+    assert cell["outputs"][0]["text"] == "x" * 1000
+
+
+def test_spill_files_stay_inside_the_spill_dir(tmp_path):
+    spill_dir = tmp_path / "spill"
+    cache = OutputCache(max_bytes=10, spill_dir=str(spill_dir))
+    cache.put(code_cell("../../outside", "x" * 100))
+    cache.put(code_cell("newest", "y" * 100))
+
+    assert cache.is_evicted("../../outside")
+    assert [p.parent for p in tmp_path.rglob("*.json")] == [spill_dir]
+    cache.cleanup()
+    # A spill dir passed in by the caller is emptied but not removed
+    assert spill_dir.exists() and list(spill_dir.iterdir()) == []
+
+
+def test_own_spill_dir_is_removed_on_cleanup():
+    cache = OutputCache(max_bytes=10)
+    cache.put(code_cell("a", "x" * 100))
+    cache.put(code_cell("b", "y" * 100))
+    spill_dir = cache.spill_dir
+    assert os.path.isdir(spill_dir)
+
+    cache.cleanup()
+    assert not os.path.exists(spill_dir)
+
+
+def test_saved_notebook_matches_json_dump_with_spilled_outputs(tmp_path):
+    pytest.importorskip("ipykernel")
+    from modules.notebook_controller import NotebookController
+
+    path = tmp_path / "spill.ipynb"
+    nb = NotebookController(str(path), output_cache_bytes=200, output_spill_dir=str(tmp_path / "spill"))
+    try:
+        for i in range(4):
+            nb.run_cell(nb.insert_cell("code", f"print('{i}' * 100)"))
+        nb.insert_cell("markdown", "# done")
+        assert nb.get_notebook_info()["output_cache"]["evicted_cells"] > 0
+
+        # A copy taken while cells are evicted still carries their outputs
+        first = nb.get_cell_by_index(0)
+        assert first["outputs"][0]["text"] == "0" * 100 + "\n"
+
+        nb.save_notebook()
+        written = path.read_text(encoding="utf-8")
+        document = json.loads(written)
+        assert written == json.dumps(document, indent=2, ensure_ascii=False)
+        assert [cell["outputs"][0]["text"] for cell in document["cells"][:4]] == [
+            str(i) * 100 + "\n" for i in range(4)
+        ]
+    finally:
+        nb.close()
@@ -0,0 +1,72 @@
+import pytest
+
+pytest.importorskip("ipykernel")
+
+
+def fingerprints(notebook, outputs):
+    return (
+        [notebook._fingerprint_output(output) for output in outputs],
+        [notebook._fingerprint_data(output) for output in outputs],
+    )
+
+
+def test_rerun_reports_new_unchanged_and_changed(notebook):
+    setup = notebook.insert_cell("code", "n = 1")
+    cell = notebook.insert_cell("code", "print('same'); print(n)\nn * 0.5")
+    notebook.run_cell(setup)
+
+    assert notebook.run_cell(cell, diff=True)["output_delta"]["status"] == "new"
+    assert notebook.run_cell(cell, diff=True)["output_delta"] == {"status": "unchanged", "count": 2}
+
+    notebook.update_cell_source(setup, "n = 2")
+    notebook.run_cell(setup)
+    delta = notebook.run_cell(cell, diff=True)["output_delta"]
+
+    assert delta["status"] == "changed"
+    result, stream = sorted(delta["changes"], key=lambda change: change["output_type"])
+    # text/plain has no trailing newline; old and new must still be separate lines
+    assert result["diff"] == "--- previous\n+++ current\n@@ -1 +1 @@\n-0.5\n+1.0"
+    assert result["changed_mime_types"].keys() == {"text/plain"}
+    assert stream["diff"] == "--- previous\n+++ current\n@@ -1,2 +1,2 @@\n same\n-1\n+2"
+
+
+def test_redrawn_plot_carries_the_new_payload(notebook):
+    old = [{"output_type": "display_data", "metadata": {},
+            "data": {"text/plain": "<Figure size 640x480>", "image/png": "AAAA"}}]
+    new = [{"output_type": "display_data", "metadata": {},
+            "data": {"text/plain": "<Figure size 640x480>", "image/png": "BBBB"}}]
+    old_hashes, old_mime_hashes = fingerprints(notebook, old)
+    new_hashes, _ = fingerprints(notebook, new)
+
+    delta = notebook._diff_outputs(old, old_hashes, new, new_hashes, old_mime_hashes)
+
+    [change] = delta["changes"]
+    assert "diff" not in change
+    assert change["changed_mime_types"].keys() == {"image/png"}
+    assert change["data"] == {"image/png": "BBBB"}
+
+
+def test_outputs_are_paired_by_kind_not_position(notebook):
+    old = [{"output_type": "stream", "name": "stdout", "text": "hello\n"}]
+    new = [{"output_type": "execute_result", "execution_count": 2, "metadata": {}, "data": {"text/plain": "42"}},
+           {"output_type": "stream", "name": "stdout", "text": "hello\n"}]
+    old_hashes, _ = fingerprints(notebook, old)
+    new_hashes, _ = fingerprints(notebook, new)
+
+    delta = notebook._diff_outputs(old, old_hashes, new, new_hashes)
+
+    assert delta["changes"] == [{"index": 0, "status": "added", "output": new[0]}]
+
+
+def test_removed_mime_type_is_reported(notebook):
+    old = [{"output_type": "execute_result", "execution_count": 1, "metadata": {},
+            "data": {"text/plain": "df", "text/html": "<table/>"}}]
+    new = [{"output_type": "execute_result", "execution_count": 2, "metadata": {},
+            "data": {"text/plain": "df"}}]
+    old_hashes, old_mime_hashes = fingerprints(notebook, old)
+    new_hashes, _ = fingerprints(notebook, new)
+
+    [change] = notebook._diff_outputs(old, old_hashes, new, new_hashes, old_mime_hashes)["changes"]
+
+    assert change["removed_mime_types"] == ["text/html"]
+    assert change["changed_mime_types"] == {}